@@ -1,10 +1,194 @@
+from __future__ import annotations
+
+from collections import deque
+from enum import Enum
+from operator import attrgetter
+from typing import Final
+
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import Patch
+import numpy as np
+
+
+# Sentinel for cached values that have not been computed yet (None is a valid result)
+class _Unset(Enum):
+    UNSET = 0
+
+
+_UNSET: Final = _Unset.UNSET
+
+# Bits of the per-individual flags built by _status_flags
+_FLAG_AFFECTED = 1
+_FLAG_MALE = 2
+_FLAG_CARRIER = 4
+
+# Bits of the mask returned by _mode_of_inheritance_mask
+_AUTOSOMAL_DOMINANT = 1
+_AUTOSOMAL_RECESSIVE = 2
+_X_LINKED_DOMINANT = 4
+_X_LINKED_RECESSIVE = 8
+_MODE_NAMES = (
+    (_AUTOSOMAL_DOMINANT, "Autosomal Dominant"),
+    (_AUTOSOMAL_RECESSIVE, "Autosomal Recessive"),
+    (_X_LINKED_DOMINANT, "X-Linked Dominant"),
+    (_X_LINKED_RECESSIVE, "X-Linked Recessive"),
+)
+# Revision of the pedigree data, stamped on cached carrier statuses and pedigree arrays.
+# Only _bump_revision changes it.
+_revision = 0
+
+
+def _bump_revision() -> None:
+    """
+    Marks every cached carrier status and pedigree array as out of date.
+    """
+    global _revision
+    _revision += 1
+
+
+def _compute_carrier_scalar(individual: Individual) -> bool | None:
+    """
+    Computes the carrier status returned by Individual.is_carrier without consulting the cache.
+
+    A child's other parent only counts as unaffected if it is known.
+
+    Args:
+        individual (Individual): The individual to evaluate.
+
+    Returns:
+        bool or None: True if the individual could be a carrier, False otherwise, None if it is indeterminable.
+    """
+    mother = individual.mother
+    father = individual.father
+
+    # No parents
+    if not mother or not father:
+        return None
+
+    # No children
+    if not individual.children:
+        return None
+
+    if individual.affected:
+        return False
+
+    # Unaffected female with affected child and unaffected father
+    if individual.sex == "F" and any(
+        child.affected and child.father and not child.father.affected
+        for child in individual.children
+    ):
+        return True
+
+    # Unaffected male with affected child and unaffected mother
+    if individual.sex == "M" and any(
+        child.affected and child.mother and not child.mother.affected
+        for child in individual.children
+    ):
+        return True
+
+    # Unaffected with affected sibling and unaffected parents
+    if not mother.affected and not father.affected:
+        # Full siblings appear in both parents' lists, so deduplicate them first
+        siblings = set(mother.children)
+        siblings.update(father.children)
+        siblings.discard(individual)
+        if any(sibling.affected for sibling in siblings):
+            return True
+
+    return False
+
+
+def _status_flags(individual: Individual) -> int:
+    """
+    Packs the status of an individual into the bits used by the inheritance checks.
+
+    The carrier bit is only evaluated for unaffected individuals, since the checks
+    treat affected individuals the same whether or not they could be carriers.
+
+    Args:
+        individual (Individual): The individual to evaluate.
+
+    Returns:
+        int: The combination of _FLAG_AFFECTED, _FLAG_MALE and _FLAG_CARRIER bits.
+    """
+    flags = _FLAG_MALE if individual.sex == "M" else 0
+    if individual.affected:
+        return flags | _FLAG_AFFECTED
+    if individual.is_carrier():
+        return flags | _FLAG_CARRIER
+    return flags
+
+
+def _mode_of_inheritance_mask(
+    individual_flags: np.ndarray, mother_flags: np.ndarray, father_flags: np.ndarray
+) -> int:
+    """
+    Vectorized version of the checks performed by Pedigree.find_mode_of_inheritance.
+
+    Each rule is evaluated for all affected individuals with both parents at once,
+    using bitwise operations on the packed flags of the individuals and their parents.
+
+    Args:
+        individual_flags (numpy.ndarray): Flags of each affected individual with both parents.
+        mother_flags (numpy.ndarray): Flags of the mother of each of those individuals.
+        father_flags (numpy.ndarray): Flags of the father of each of those individuals.
+
+    Returns:
+        int: Bitmask of the modes of inheritance that remain possible.
+    """
+    mask = (
+        _AUTOSOMAL_DOMINANT
+        | _AUTOSOMAL_RECESSIVE
+        | _X_LINKED_DOMINANT
+        | _X_LINKED_RECESSIVE
+    )
+    if len(individual_flags) == 0:
+        return mask
+
+    affected_or_carrier = _FLAG_AFFECTED | _FLAG_CARRIER
+    mother_unaffected_noncarrier = (mother_flags & affected_or_carrier) == 0
+    father_unaffected_noncarrier = (father_flags & affected_or_carrier) == 0
+
+    # If both parents unaffected, rule out Autosomal Dominant and X-Linked Dominant
+    if (((mother_flags | father_flags) & _FLAG_AFFECTED) == 0).any():
+        mask &= ~(_AUTOSOMAL_DOMINANT | _X_LINKED_DOMINANT)
+
+    # If one parent is unaffected and not a carrier, rule out Autosomal Recessive
+    if (father_unaffected_noncarrier | mother_unaffected_noncarrier).any():
+        mask &= ~_AUTOSOMAL_RECESSIVE
+
+    # If individual is male and mother is neither affected nor a carrier, rule out X-linked recessive
+    if (((individual_flags & _FLAG_MALE) != 0) & mother_unaffected_noncarrier).any():
+        mask &= ~_X_LINKED_RECESSIVE
+
+    return mask
 
 
 class Individual:
+    __slots__ = (
+        "id",
+        "sex",
+        "affected",
+        "mother",
+        "father",
+        "children",
+        "_num_id",
+        "_generation",
+        "_ancestors",
+        "_carrier",
+        "_carrier_revision",
+    )
+
     def __init__(
-        self, id_number, sex, affected, mother=None, father=None, children=None
-    ):
+        self,
+        id_number: int | str,
+        sex: str,
+        affected: bool,
+        mother: Individual | None = None,
+        father: Individual | None = None,
+        children: list[Individual] | None = None,
+    ) -> None:
         """
         Initializes an individual with the given attributes.
 
@@ -16,14 +200,25 @@ class Individual:
             father (Individual, optional): The father of the individual. Defaults to None.
             children (list, optional): The list of children of the individual. Defaults to an empty list.
         """
-        self.id = id_number
-        self.sex = sex
-        self.affected = affected
-        self.mother = mother
-        self.father = father
-        self.children = children if children is not None else []
-
-    def add_parent_child_relationship(self, parent, sex):
+        self.id: int | str = id_number
+        self.sex: str = sex
+        self.affected: bool = affected
+        self.mother: Individual | None = mother
+        self.father: Individual | None = father
+        self.children: list[Individual] = children if children is not None else []
+        # Numeric part of the identifier (e.g. 12 for 'I12'), used for sorting
+        try:
+            self._num_id: int = (
+                int(id_number[1:]) if isinstance(id_number, str) else int(id_number)
+            )
+        except (TypeError, ValueError):
+            self._num_id = 0
+        self._generation: int | None = None
+        self._ancestors: frozenset[Individual] | None = None
+        self._carrier: bool | None | _Unset = _UNSET
+        self._carrier_revision = 0
+
+    def add_parent_child_relationship(self, parent: Individual, sex: str) -> None:
         """
         Establishes a parent-child relationship between the individual and a parent.
 
@@ -37,8 +232,34 @@ class Individual:
         elif sex == "F":
             self.mother = parent
             parent.children.append(self)  # Add self as a child to the parent
+        else:
+            return
+        _bump_revision()
+        if self.children:
+            self._invalidate_lineage()
+        else:
+            self._generation = None
+            self._ancestors = None
+
+    def _invalidate_lineage(self) -> None:
+        """
+        Clears the cached generation and ancestors of the individual and all of their descendants.
 
-    def get_children(self):
+        Each descendant is visited once, even when it can be reached through several
+        lines of descent, as in consanguineous pedigrees.
+        """
+        visited = set()
+        stack = [self]
+        while stack:
+            individual = stack.pop()
+            if individual in visited:
+                continue
+            visited.add(individual)
+            individual._generation = None
+            individual._ancestors = None
+            stack.extend(individual.children)
+
+    def get_children(self) -> list[Individual]:
         """
         Returns the list of children of the individual.
 
@@ -47,40 +268,93 @@ class Individual:
         """
         return self.children
 
-    def get_ancestors(self, ancestors=None):
+    def get_ancestors(self) -> frozenset[Individual]:
         """
-        Returns the list of ancestors of the individual.
+        Returns the set of ancestors of the individual.
 
-        Args:
-            ancestors (list, optional): The list of ancestors. Defaults to an empty list.
+        The ancestors are collected with an explicit stack rather than recursion, and
+        the cached ancestor sets of relatives are reused when available. Ancestors that
+        were already visited are skipped, so ancestors shared through consanguinity are
+        traversed once and the traversal terminates even if the pedigree has a cycle.
+
+        Returns:
+            frozenset: The set of ancestors.
+        """
+        if self._ancestors is None:
+            visited = set()
+            stack = [self.mother, self.father]
+            while stack:
+                parent = stack.pop()
+                if parent is None or parent in visited:
+                    continue
+                visited.add(parent)
+                if parent._ancestors is not None:
+                    visited.update(parent._ancestors)
+                else:
+                    stack.append(parent.mother)
+                    stack.append(parent.father)
+            self._ancestors = frozenset(visited)
+        return self._ancestors
+
+    def get_ancestors_list(self) -> list[Individual]:
+        """
+        Returns the ancestors of the individual as a list.
 
         Returns:
             list: The list of ancestors.
         """
-        if ancestors is None:
-            ancestors = []
-        if self.mother:
-            ancestors.append(self.mother)
-            self.mother.get_ancestors(ancestors)
-        if self.father:
-            ancestors.append(self.father)
-            self.father.get_ancestors(ancestors)
-        return ancestors
+        return list(self.get_ancestors())
 
-    def get_generation(self):
+    def get_generation(self) -> int:
         """
         Returns the generation of the individual based on their parents.
 
+        The result is cached on the individual and reused until a parent-child
+        relationship involving the individual or one of their ancestors changes.
+
         Returns:
             int: The generation of the individual.
-        """
-        if self.mother or self.father:
-            mother_generation = self.mother.get_generation() if self.mother else 0
-            father_generation = self.father.get_generation() if self.father else 0
-            return max(mother_generation, father_generation) + 1
-        return 0
 
-    def is_carrier(self):
+        Raises:
+            ValueError: If the individual is their own ancestor.
+        """
+        if self._generation is not None:
+            return self._generation
+
+        # Resolve uncached ancestors first with an explicit depth-first stack instead of
+        # recursion. An individual is in progress while its parents are being resolved,
+        # so reaching it again means the pedigree contains a cycle.
+        in_progress = set()
+        stack = [(self, False)]
+        generation = 0
+        while stack:
+            individual, expanded = stack.pop()
+            if individual._generation is not None:
+                continue
+            parents = [
+                parent for parent in (individual.mother, individual.father) if parent
+            ]
+            if not expanded:
+                if individual in in_progress:
+                    raise ValueError(
+                        f"Pedigree contains a cycle through individual {individual.id}"
+                    )
+                in_progress.add(individual)
+                stack.append((individual, True))
+                stack.extend(
+                    (parent, False) for parent in parents if parent._generation is None
+                )
+                continue
+            generation = 0
+            for parent in parents:
+                parent_generation = parent._generation
+                if parent_generation is not None:
+                    generation = max(generation, parent_generation + 1)
+            individual._generation = generation
+            in_progress.discard(individual)
+        return generation
+
+    def is_carrier(self) -> bool | None:
         """
         Determines whether an individual could potentially be a carrier.
 
@@ -88,78 +362,190 @@ class Individual:
         - The individual is unaffected but has at least one affected child.
         - Both parents are unaffected but the individual has an affected sibling.
 
+        The result is cached on the individual and reused until a parent-child
+        relationship changes.
+
         Returns:
             bool or None: True if the individual could be a carrier, False otherwise, None if it is indeterminable.
         """
-        # No parents
-        if not self.mother or not self.father:
-            return None
+        carrier = self._carrier
+        if carrier is _UNSET or self._carrier_revision != _revision:
+            carrier = self._carrier = _compute_carrier_scalar(self)
+            self._carrier_revision = _revision
+        return carrier
 
-        # No children
-        if not self.children:
-            return None
 
-        # Unaffected female with affected child and unaffected father
-        if (
-            self.sex == "F"
-            and not self.affected
-            and any(
-                child.affected and not child.father.affected for child in self.children
-            )
-        ):
-            return True
+class Pedigree:
+    def __init__(self, individuals: list[Individual] | None = None) -> None:
+        self.individuals: list[Individual] = [] if individuals is None else individuals
+        # Array representation, rebuilt when the revision or the membership changes
+        self._arrays_revision: int | None = None
+        self._arrays_members: list[Individual] = []
+        self._affected: np.ndarray = np.zeros(0, dtype=bool)
+        self._affected_list: list[Individual] | None = None
+        self._unaffected_list: list[Individual] | None = None
+        self._inheritance_flags: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+        # Identifier order used by visualize_pedigree
+        self._index_key: tuple[Individual, ...] | None = None
+        self._sorted_individuals: list[Individual] = []
+        self._id_to_index: dict[int | str, int] = {}
+
+    def _reindex(self) -> None:
+        """
+        Caches the individuals sorted by identifier and their position in that order.
+        """
+        self._sorted_individuals = sorted(self.individuals, key=attrgetter("_num_id"))
+        self._id_to_index = {
+            individual.id: index
+            for index, individual in enumerate(self._sorted_individuals)
+        }
+        self._index_key = tuple(self.individuals)
 
-        # Unaffected male with affected child and unaffected mother
-        if (
-            self.sex == "M"
-            and not self.affected
-            and any(
-                child.affected and not child.mother.affected for child in self.children
-            )
-        ):
-            return True
+    def _build_arrays(self) -> None:
+        """
+        Builds the affected mask used by the vectorized queries.
+
+        The affected status of every individual is stored as a boolean array indexed by
+        position in self.individuals. The inheritance flags, which need carrier
+        statuses, are only built when find_mode_of_inheritance asks for them.
+        """
+        individuals = self.individuals
+        self._affected = np.array(
+            [bool(individual.affected) for individual in individuals], dtype=bool
+        )
+        self._affected_list = None
+        self._unaffected_list = None
+        self._inheritance_flags = None
+        self._arrays_members = list(individuals)
+        self._arrays_revision = _revision
+
+    def _build_inheritance_flags(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Builds the packed status flags used by find_mode_of_inheritance.
+
+        For each affected individual with both parents, the flags of the individual, the
+        mother and the father are stored in three parallel arrays. Parents are read from
+        the individuals themselves, so parents that are not listed in self.individuals
+        are still consulted.
+
+        Returns:
+            tuple: The individual, mother and father flags as numpy.ndarray of uint8.
+        """
+        individual_flags = []
+        mother_flags = []
+        father_flags = []
+        for individual in self._affected_individuals():
+            mother = individual.mother
+            father = individual.father
+            if mother and father:
+                individual_flags.append(_status_flags(individual))
+                mother_flags.append(_status_flags(mother))
+                father_flags.append(_status_flags(father))
+        return (
+            np.array(individual_flags, dtype=np.uint8),
+            np.array(mother_flags, dtype=np.uint8),
+            np.array(father_flags, dtype=np.uint8),
+        )
+
+    def _ensure_arrays(self) -> None:
+        """
+        Rebuilds the array representation if the pedigree changed since it was built.
 
-        # Unaffected with affected sibling and unaffected parents
+        Replacing an individual in self.individuals is detected even if the length of
+        the list does not change.
+        """
         if (
-            not self.affected
-            and not self.mother.affected
-            and not self.father.affected
-            and any(
-                sibling.affected
-                for sibling in self.mother.children + self.father.children
-                if sibling != self
-            )
+            self._arrays_revision != _revision
+            or self._arrays_members != self.individuals
         ):
-            return True
+            self._build_arrays()
 
-        return False
+    def mark_dirty(self) -> None:
+        """
+        Discards every cached result of the pedigree.
 
+        Call this after changing an individual's affected status or sex directly, since
+        such changes cannot be detected automatically. Cached carrier statuses are
+        refreshed for every individual, including parents that are not listed in the
+        pedigree.
+        """
+        _bump_revision()
 
-class Pedigree:
-    def __init__(self, individuals=None):
-        self.individuals = [] if individuals is None else individuals
+    def _affected_individuals(self) -> list[Individual]:
+        """
+        Returns the cached list of affected individuals, building it if needed.
 
-    def find_affected(self):
+        Returns:
+            list: The cached list of affected individuals, which must not be modified.
+        """
+        self._ensure_arrays()
+        if self._affected_list is None:
+            self._affected_list = [
+                self.individuals[i] for i in np.flatnonzero(self._affected).tolist()
+            ]
+        return self._affected_list
+
+    def find_affected(self) -> list[Individual]:
         """
         Returns the list of affected individuals in the pedigree.
 
+        The result is cached until the pedigree changes; each call returns a new list.
+
         Returns:
             list: The list of affected individuals.
         """
-        return [individual for individual in self.individuals if individual.affected]
+        return list(self._affected_individuals())
 
-    def find_unaffected(self):
+    def find_unaffected(self) -> list[Individual]:
         """
         Returns the list of unaffected individuals in the pedigree.
 
+        The result is cached until the pedigree changes; each call returns a new list.
+
         Returns:
             list: The list of unaffected individuals.
         """
-        return [
-            individual for individual in self.individuals if not individual.affected
-        ]
+        self._ensure_arrays()
+        if self._unaffected_list is None:
+            self._unaffected_list = [
+                self.individuals[i] for i in np.flatnonzero(~self._affected).tolist()
+            ]
+        return list(self._unaffected_list)
+
+    def _compute_generations(self) -> None:
+        """
+        Computes the generation of every individual in a single top-down pass.
 
-    def find_mode_of_inheritance(self):
+        Starting from the founders (individuals without parents), each child is assigned
+        a generation once the generations of all of its known parents are available.
+        """
+        for individual in self.individuals:
+            individual._generation = None
+
+        queue: deque[Individual] = deque()
+        for individual in self.individuals:
+            if individual.mother is None and individual.father is None:
+                individual._generation = 0
+                queue.append(individual)
+
+        while queue:
+            individual = queue.popleft()
+            for child in individual.children:
+                if child._generation is not None:
+                    continue
+                generation = 0
+                for parent in (child.mother, child.father):
+                    if parent is None:
+                        continue
+                    parent_generation = parent._generation
+                    if parent_generation is None:
+                        break
+                    generation = max(generation, parent_generation + 1)
+                else:  # Every known parent already has a generation
+                    child._generation = generation
+                    queue.append(child)
+
+    def find_mode_of_inheritance(self) -> str | set[str]:
         """
         Determine the possible mode(s) of inheritance of a trait in a pedigree.
 
@@ -177,62 +563,49 @@ class Pedigree:
         Returns:
             str or set: The remaining possible mode(s) of inheritance. It returns a string if only one mode is possible, or a set of strings if multiple modes are possible.
         """
-
-        possible_modes = {
-            "Autosomal Dominant",
-            "Autosomal Recessive",
-            "X-Linked Dominant",
-            "X-Linked Recessive",
-        }
-
-        for individual in self.find_affected():
-            if individual.father and individual.mother:
-                # If both parents unaffected, rule out Autosomal Dominant and X-Linked Dominant
-                if not individual.father.affected and not individual.mother.affected:
-                    possible_modes.discard("Autosomal Dominant")
-                    possible_modes.discard("X-Linked Dominant")
-
-                # If one parent is unaffected and not a carrier, rule out Autosomal Recessive
-                if (
-                    not individual.father.affected
-                    and not individual.father.is_carrier()
-                ) or (
-                    not individual.mother.affected
-                    and not individual.mother.is_carrier()
-                ):
-                    possible_modes.discard("Autosomal Recessive")
-
-                # If individual is male and mother is neither affected nor a carrier, rule out X-linked recessive
-                if individual.sex == "M" and not (
-                    individual.mother.affected or individual.mother.is_carrier()
-                ):
-                    possible_modes.discard("X-Linked Recessive")
+        self._ensure_arrays()
+        flags = self._inheritance_flags
+        if flags is None:
+            flags = self._inheritance_flags = self._build_inheritance_flags()
+        mask = _mode_of_inheritance_mask(*flags)
+        possible_modes = {name for bit, name in _MODE_NAMES if mask & bit}
 
         if len(possible_modes) == 1:
             return possible_modes.pop()
         return possible_modes
 
-    def visualize_pedigree(self):
+    def visualize_pedigree(self) -> None:
         """
         Visualizes the pedigree using matplotlib.
         """
-        # Sort individuals
-        individuals = sorted(self.individuals, key=lambda x: int(x.id[1:]))
+        if self._index_key != tuple(self.individuals):
+            self._reindex()
+        individuals = self._sorted_individuals
+        id_to_index = self._id_to_index
+        self._compute_generations()
 
         plt.figure(figsize=(8, 6))
         ax = plt.gca()
         ax.set_aspect("equal")
 
-        max_generations = max(
+        generations = np.array(
             [individual.get_generation() for individual in individuals]
         )
-        id_to_index = {
-            individual.id: index for index, individual in enumerate(individuals)
-        }
+        max_generations = generations.max()
+
+        # Plot coordinates of every individual, looked up by index for parent edges
+        xs = np.arange(len(individuals))
+        ys = max_generations - generations
+
+        # Shapes and parent edges are collected and drawn as a few batched collections
+        circles = []
+        rects = []
+        edge_segments = []
 
         for index, individual in enumerate(individuals):
-            x = index
-            y = max_generations - individual.get_generation()
+            x = xs[index]
+            y = ys[index]
+            shape: Patch
 
             if individual.sex == "M":
                 if individual.affected:
@@ -245,6 +618,7 @@ class Pedigree:
                         facecolor="white",
                         linewidth=2,
                     )
+                circles.append(shape)
             else:
                 if individual.affected:
                     shape = plt.Rectangle((x - 0.5, y - 0.5), 1, 1, color="black")
@@ -257,18 +631,19 @@ class Pedigree:
                         facecolor="white",
                         linewidth=2,
                     )
-
-            ax.add_patch(shape)
+                rects.append(shape)
 
             if individual.mother:
-                x_mom = id_to_index[individual.mother.id]
-                y_mom = max_generations - individual.mother.get_generation()
-                plt.plot([x, x_mom], [y, y_mom], "-")
+                mom_index = id_to_index[individual.mother.id]
+                edge_segments.append([(x, y), (xs[mom_index], ys[mom_index])])
 
             if individual.father:
-                x_dad = id_to_index[individual.father.id]
-                y_dad = max_generations - individual.father.get_generation()
-                plt.plot([x, x_dad], [y, y_dad], "-")
+                dad_index = id_to_index[individual.father.id]
+                edge_segments.append([(x, y), (xs[dad_index], ys[dad_index])])
+
+        ax.add_collection(PatchCollection(circles, match_original=True))
+        ax.add_collection(PatchCollection(rects, match_original=True))
+        ax.add_collection(LineCollection(edge_segments, colors="k"))
 
         plt.xlim(-1, len(individuals))  # Extend x-axis
         plt.ylim(-1, max_generations + 1)
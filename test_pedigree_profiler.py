@@ -0,0 +1,40 @@
+import unittest
+
+from pedigree_profiler import Individual, Pedigree
+
+
+class MarkDirtyTest(unittest.TestCase):
+    def test_refreshes_carrier_status_of_parents_outside_the_pedigree(self):
+        # I3 and I4 both have parents and a child, but I3 is not listed in the pedigree
+        I1 = Individual("I1", "M", False)
+        I2 = Individual("I2", "F", False)
+        I3 = Individual("I3", "F", False)
+        I4 = Individual("I4", "M", False)
+        I5 = Individual("I5", "M", False)
+        I6 = Individual("I6", "F", False)
+        I7 = Individual("I7", "M", False)
+        I3.add_parent_child_relationship(I1, "M")
+        I3.add_parent_child_relationship(I2, "F")
+        I4.add_parent_child_relationship(I5, "M")
+        I4.add_parent_child_relationship(I6, "F")
+        I7.add_parent_child_relationship(I3, "F")
+        I7.add_parent_child_relationship(I4, "M")
+        pedigree = Pedigree([I1, I2, I4, I5, I6, I7])
+        self.assertFalse(I3.is_carrier())
+
+        I7.affected = True
+        pedigree.mark_dirty()
+
+        self.assertTrue(I3.is_carrier())
+        self.assertEqual(
+            pedigree.find_mode_of_inheritance(),
+            {"Autosomal Recessive", "X-Linked Recessive"},
+        )
+        self.assertEqual(
+            Pedigree([I1, I2, I4, I5, I6, I7]).find_mode_of_inheritance(),
+            {"Autosomal Recessive", "X-Linked Recessive"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()